@@ -0,0 +1,232 @@
+"""Asyncio client for bulk reads, requires aiohttp.
+
+    async with AsyncFakturoid('yourslug', 'your@email.com', 'clientid...', 'clientsecret...') as fa:
+        async for invoice in fa.invoices(since=date(2024, 1, 1)):
+            print(invoice.number, invoice.total)
+"""
+import asyncio
+import itertools
+import time
+from base64 import b64encode
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from fakturoid.api import (Fakturoid, AccountApi, BankAccountsApi, SubjectsApi, InvoicesApi, ExpensesApi,
+                           GeneratorsApi, _handle_response, _loads)
+from fakturoid.models import Account, BankAccount, Expense, Generator, Invoice, Subject
+
+__all__ = ['AsyncFakturoid']
+
+_EPOCH_THRESHOLD = 10 ** 9  # larger reset values are absolute timestamps, not delays
+
+
+def _delay_seconds(value):
+    """Seconds to wait from header value, either relative delay or absolute epoch timestamp / HTTP date."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    if seconds > _EPOCH_THRESHOLD:
+        seconds -= time.time()
+    return seconds
+
+
+def _parse_rate_limit(headers):
+    """Return (remaining requests, seconds to window reset), either may be None.
+
+    Fakturoid sends ``X-RateLimit-Policy: default;q=400;w=60`` and ``X-RateLimit: default;r=399;t=55``,
+    common ``X-RateLimit-Remaining``/``X-RateLimit-Reset`` headers are used as fallback.
+    """
+    value = headers.get('X-RateLimit')
+    if not value:
+        remaining = headers.get('X-RateLimit-Remaining')
+        return (int(remaining) if remaining and remaining.isdigit() else None,
+                _delay_seconds(headers.get('X-RateLimit-Reset')))
+    params = _policy_params(value)
+    remaining, reset = params.get('r'), params.get('t')
+    if reset is None:
+        reset = _policy_params(headers.get('X-RateLimit-Policy', '')).get('w')
+    return remaining, reset
+
+
+def _policy_params(value):
+    # 'default;r=399;t=55' -> {'r': 399, 't': 55}, only the first policy is used
+    params = {}
+    for item in value.split(',')[0].split(';')[1:]:
+        key, _, number = item.strip().partition('=')
+        if number.isdigit():
+            params[key] = int(number)
+    return params
+
+
+def _retry_delay(headers, attempt):
+    """Seconds to wait before retrying rate limited (429) request."""
+    delay = _delay_seconds(headers.get('Retry-After'))
+    if delay is None:
+        delay = _parse_rate_limit(headers)[1]
+    if delay is None:
+        delay = 2 ** attempt
+    return delay
+
+
+class AsyncFakturoid(object):
+    """Fakturoid API v3 client for asyncio, read only subset of Fakturoid methods.
+
+    Lists returned by subjects(), invoices() and expenses() are iterated with ``async for``,
+    pages are fetched concurrently.
+    """
+    user_agent = Fakturoid.user_agent
+    base_url = 'https://app.fakturoid.cz/api/v3/'
+
+    connections_per_host = 64
+    max_retries = 5  # retries of rate limited requests
+    max_retry_delay = 60  # upper bound of single rate limit wait in seconds
+
+    def __init__(self, slug, email, client_id, client_secret, user_agent=None, concurrency=8):
+        self.slug = slug
+        self.client_id_secret = client_id + ':' + client_secret
+        self.email = email
+        self.user_agent = user_agent or self.user_agent
+        self._url_prefix = f'{self.base_url}accounts/{slug}/'
+
+        self.concurrency = concurrency
+
+        self._session = None
+        self._semaphore = None
+        self._token_lock = None
+        self._access_token = None
+        self._access_token_expiration = None
+        self._throttled_until = 0.0  # event loop time, no requests are sent before it
+
+        self._models_api = {
+            Account: AccountApi(self),
+            BankAccount: BankAccountsApi(self),
+            Subject: SubjectsApi(self),
+            Invoice: InvoicesApi(self),
+            Expense: ExpensesApi(self),
+            Generator: GeneratorsApi(self),
+        }
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._token_lock = asyncio.Lock()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.connections_per_host),
+                headers={'User-Agent': self.user_agent},
+            )
+            # ensure new token to validate credentials, __aexit__ is not called when this fails
+            try:
+                await self.refresh_access_token()
+            except BaseException:
+                await self.close()
+                raise
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def refresh_access_token(self):
+        async with self._session.post(
+            self.base_url + 'oauth/token',
+            headers={'Accept': 'application/json',
+                     'Authorization': 'Basic ' + b64encode(
+                         self.client_id_secret.encode()).decode()},
+            data={'grant_type': 'client_credentials'},
+        ) as resp:
+            try:
+                response = _loads(await resp.read())
+                the_token = response['access_token']
+                token_expiration = int(response['expires_in'])
+            except Exception:
+                resp.raise_for_status()
+                raise
+        self._access_token_expiration = datetime.now() + timedelta(seconds=token_expiration-900)
+        self._access_token = the_token
+        return self._access_token
+
+    async def account(self):
+        mapi = self._models_api[Account]
+        return mapi.unpack(await self._get(mapi.endpoint))
+
+    async def bank_accounts(self):
+        mapi = self._models_api[BankAccount]
+        return mapi.unpack(await self._get(mapi.endpoint))
+
+    async def subject(self, id):
+        return await self._load(Subject, id)
+
+    def subjects(self, *args, **kwargs):
+        return self._models_api[Subject].find(*args, **kwargs)
+
+    async def invoice(self, id):
+        return await self._load(Invoice, id)
+
+    def invoices(self, *args, **kwargs):
+        return self._models_api[Invoice].find(*args, **kwargs)
+
+    async def expense(self, id):
+        return await self._load(Expense, id)
+
+    def expenses(self, *args, **kwargs):
+        return self._models_api[Expense].find(*args, **kwargs)
+
+    async def generator(self, id):
+        return await self._load(Generator, id)
+
+    async def _load(self, model_type, id):
+        if not isinstance(id, int):
+            raise TypeError('id must be int')
+        mapi = self._models_api[model_type]
+        return mapi.unpack(await self._get(f'{mapi.endpoint}/{id}'))
+
+    async def _make_request(self, method, success_status, endpoint, **kwargs):
+        if self._session is None:
+            raise RuntimeError('call open() or use async with')
+        url = self._url_prefix + endpoint + '.json'
+        async with self._token_lock:
+            if datetime.now() > self._access_token_expiration:
+                await self.refresh_access_token()
+        headers = {'Authorization': 'Bearer ' + self._access_token}
+        headers.update(kwargs.pop('headers', {}))
+
+        for attempt in itertools.count():
+            async with self._semaphore:
+                await self._wait_for_rate_limit()
+                async with self._session.request(method, url, headers=headers, **kwargs) as r:
+                    remaining, reset = _parse_rate_limit(r.headers)
+                    if r.status != 429 or attempt >= self.max_retries:
+                        if remaining == 0 and reset is not None:
+                            # window is exhausted, hold back following requests instead of hitting 429
+                            self._throttle(reset)
+                        return _handle_response(r.status, r.headers, await r.read(), success_status,
+                                                kwargs.get('params'), r.raise_for_status)
+                    self._throttle(_retry_delay(r.headers, attempt))
+
+    def _throttle(self, delay):
+        delay = max(0, min(delay, self.max_retry_delay))
+        until = asyncio.get_running_loop().time() + delay
+        self._throttled_until = max(self._throttled_until, until)
+
+    async def _wait_for_rate_limit(self):
+        delay = self._throttled_until - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _get(self, endpoint, params=None):
+        return await self._make_request('get', 200, endpoint, params=params)
@@ -1,17 +1,100 @@
 import re
-import json
+import threading
 from datetime import date, datetime, timedelta
 from functools import wraps
 from base64 import b64encode
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    try:
+        import ujson as json
+    except ImportError:
+        import json
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode('utf-8')
 
 from fakturoid.models import Account, BankAccount, Expense, ExpensePayment, Generator, Invoice, InvoiceMessage, InvoicePayment, Subject
 from fakturoid.paging import ModelList
 
 __all__ = ['Fakturoid']
 
-link_header_pattern = re.compile(r'page=(\d+)[^>]*>; rel="last"')
+link_header_pattern = re.compile(r'page=(\d+)[^>]*>\s*;\s*rel="last"', re.IGNORECASE)
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+_DATE_PARAMS = frozenset({'since', 'until', 'updated_since', 'updated_until'})
+_INT_PARAMS = frozenset({'subject_id'})
+
+
+def _build_params(**kwargs):
+    """Validate and serialize find() filters, unset (falsy) values are skipped."""
+    params = {}
+    for key, value in kwargs.items():
+        if not value:
+            continue
+        if key in _DATE_PARAMS:
+            if not isinstance(value, (datetime, date)):
+                raise TypeError("'{0}' parameter must be date or datetime".format(key))
+            value = value.isoformat()
+        elif key in _INT_PARAMS:
+            if not isinstance(value, int):
+                raise TypeError("'{0}' parameter must be int".format(key))
+        params[key] = value
+    return params
+
+
+def _extract_page_link(header):
+    m = link_header_pattern.search(header)
+    if m:
+        return int(m.group(1))
+    return None
+
+
+def _handle_response(status_code, headers, content, success_status, params, raise_for_status):
+    """Process API response, shared by Fakturoid and AsyncFakturoid."""
+    if status_code == 204 or not content:
+        json_result = None
+    else:
+        try:
+            json_result = _loads(content)
+        except Exception:
+            json_result = None
+
+    if status_code == success_status:
+        response = {'json': json_result}
+        # page count is only needed for the first page of a paged list
+        if params and params.get('page') == 1 and 'link' in headers:
+            page_count = _extract_page_link(headers['link'])
+            if page_count:
+                response['page_count'] = page_count
+        return response
+
+    if json_result and "errors" in json_result:
+        raise ValueError(json_result["errors"])
+
+    raise_for_status()
+
+
+class _SubjectsAccessor(object):
+    """Makes fa.subjects() callable for find and fa.subjects.search() for full text search."""
+    __slots__ = ('_fa',)
+
+    def __init__(self, fa):
+        self._fa = fa
+
+    def __call__(self, *args, **kwargs):
+        return self._fa._subjects_find(*args, **kwargs)
+
+    def search(self, *args, **kwargs):
+        return self._fa._subjects_search(*args, **kwargs)
 
 
 class Fakturoid(object):
@@ -27,6 +110,14 @@ class Fakturoid(object):
         self.client_id_secret = client_id + ':' + client_secret
         self.email = email
         self.user_agent = user_agent or self.user_agent
+        self._url_prefix = f'https://app.fakturoid.cz/api/v3/accounts/{slug}/'
+
+        # single keep-alive session shared by all API calls
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=16))
+        self._session.headers['User-Agent'] = self.user_agent
+        # pages may be loaded from worker threads, only one of them refreshes the token
+        self._token_lock = threading.Lock()
 
         # ensure new token to validate credentials
         self.refresh_access_token()
@@ -43,39 +134,34 @@ class Fakturoid(object):
             InvoicePayment: PaymentsApi(self),
         }
 
-        # Hack to expose full seach on subjects as
-        #
-        #     fa.subjects.search()
-        #
-        # TODO Keep this API but make internal code redesing in future.
-        def subjects_find(*args, **kwargs):
-            return self._subjects_find(*args, **kwargs)
-
-        def subjects_search(*args, **kwargs):
-            return self._subjects_search(*args, **kwargs)
-        self.subjects = subjects_find
-        self.subjects.search = subjects_search
+        # expose full search on subjects as fa.subjects.search()
+        self.subjects = _SubjectsAccessor(self)
 
     @property
     def access_token(self):
         if self._access_token is None:
             self.refresh_access_token()
         elif datetime.now() > self._access_token_expiration:
-            self.refresh_access_token()
+            self._refresh_expired_token()
         return self._access_token
 
+    def _refresh_expired_token(self):
+        with self._token_lock:
+            # token could be already refreshed by another thread
+            if datetime.now() > self._access_token_expiration:
+                self.refresh_access_token()
+
     def refresh_access_token(self):
-        resp = requests.request(
+        resp = self._session.request(
             method='POST',
             url='https://app.fakturoid.cz/api/v3/oauth/token',
-            headers={'User-Agent': self.user_agent,
-                     'Accept': 'application/json',
+            headers={'Accept': 'application/json',
                      'Authorization': 'Basic ' + b64encode(
                          self.client_id_secret.encode()).decode()},
             data={'grant_type': 'client_credentials'},
             )
         try:
-            response = resp.json()
+            response = _loads(resp.content)
             the_token = response['access_token']
             token_expiration = int(response['expires_in'])
         except Exception:
@@ -83,6 +169,7 @@ class Fakturoid(object):
             raise
         self._access_token_expiration = datetime.now() + timedelta(seconds=token_expiration-900)
         self._access_token = the_token
+        self._session.headers['Authorization'] = 'Bearer ' + the_token
         return self._access_token
 
     def model_api(model_type=None):
@@ -167,44 +254,23 @@ class Fakturoid(object):
         """
         mapi.delete(obj, **kwargs)
 
-    def _extract_page_link(self, header):
-        m = link_header_pattern.search(header)
-        if m:
-            return int(m.group(1))
-        return None
-
     def _make_request(self, method, success_status, endpoint, **kwargs):
-        url = "https://app.fakturoid.cz/api/v3/accounts/{0}/{1}.json".format(self.slug, endpoint)
-        headers = {'User-Agent': self.user_agent,
-                   'Authorization': 'Bearer ' + self.access_token,}
-        headers.update(kwargs.pop('headers', {}))
-        r = getattr(requests, method)(url, headers=headers, **kwargs)
-        try:
-            json_result = r.json()
-        except Exception:
-            json_result = None
-
-        if r.status_code == success_status:
-            response = {'json': json_result}
-            if 'link' in r.headers:
-                page_count = self._extract_page_link(r.headers['link'])
-                if page_count:
-                    response['page_count'] = page_count
-            return response
-
-        if json_result and "errors" in json_result:
-            raise ValueError(json_result["errors"])
-
-        r.raise_for_status()
+        url = self._url_prefix + endpoint + '.json'
+        # session sends current token in Authorization header, only refresh it when expired
+        if datetime.now() > self._access_token_expiration:
+            self._refresh_expired_token()
+        r = self._session.request(method, url, **kwargs)
+        return _handle_response(r.status_code, r.headers, r.content, success_status, kwargs.get('params'),
+                                r.raise_for_status)
 
     def _get(self, endpoint, params=None):
         return self._make_request('get', 200, endpoint, params=params)
 
     def _post(self, endpoint, data, params=None):
-        return self._make_request('post', 201, endpoint, headers={'Content-Type': 'application/json'}, data=json.dumps(data), params=params)
+        return self._make_request('post', 201, endpoint, headers=_JSON_HEADERS, data=_dumps(data), params=params)
 
     def _put(self, endpoint, data):
-        return self._make_request('put', 200, endpoint, headers={'Content-Type': 'application/json'}, data=json.dumps(data))
+        return self._make_request('put', 200, endpoint, headers=_JSON_HEADERS, data=_dumps(data))
 
     def _delete(self, endpoint):
         return self._make_request('delete', 204, endpoint)
@@ -229,20 +295,18 @@ class ModelApi(object):
 
     def unpack(self, response):
         raw = response['json']
+        from_dict = self.model_type._from_dict
         if isinstance(raw, list):
-            objects = []
-            for fields in raw:
-                objects.append(self.model_type(**fields))
-            return objects
+            return [from_dict(fields) for fields in raw]
         else:
-            return self.model_type(**raw)
+            return from_dict(raw)
 
 
 class CrudModelApi(ModelApi):
     def load(self, id):
         if not isinstance(id, int):
             raise TypeError('id must be int')
-        response = self.session._get('{0}/{1}'.format(self.endpoint, id))
+        response = self.session._get(f'{self.endpoint}/{id}')
         return self.unpack(response)
 
     def find(self, params={}, endpoint=None):
@@ -251,14 +315,14 @@ class CrudModelApi(ModelApi):
 
     def save(self, model):
         if model.id:
-            result = self.session._put('{0}/{1}'.format(self.endpoint, model.id), model.get_fields())
+            result = self.session._put(f'{self.endpoint}/{model.id}', model.get_fields())
         else:
             result = self.session._post(self.endpoint, model.get_fields())
         model.update(result['json'])
 
     def delete(self, model, **kwargs):
         id = self.extract_id(model)
-        self.session._delete('{0}/{1}'.format(self.endpoint, id))
+        self.session._delete(f'{self.endpoint}/{id}')
 
 
 class AccountApi(ModelApi):
@@ -283,17 +347,7 @@ class SubjectsApi(CrudModelApi):
     endpoint = 'subjects'
 
     def find(self, since=None, updated_since=None, custom_id=None):
-        params = {}
-        if since:
-            if not isinstance(since, (datetime, date)):
-                raise TypeError("'since' parameter must be date or datetime")
-            params['since'] = since.isoformat()
-        if updated_since:
-            if not isinstance(updated_since, (datetime, date)):
-                raise TypeError("'updated_since' parameter must be date or datetime")
-            params['updated_since'] = updated_since.isoformat()
-        if custom_id:
-            params['custom_id'] = custom_id
+        params = _build_params(since=since, updated_since=updated_since, custom_id=custom_id)
         return ModelList(self, self.endpoint, params)
 
     def search(self, query):
@@ -302,7 +356,7 @@ class SubjectsApi(CrudModelApi):
         """
         if not isinstance(query, str):
             raise TypeError("'query' parameter must be str")
-        response = self.session._get('subjects/search'.format(self.endpoint), {'query': query})
+        response = self.session._get(f'{self.endpoint}/search', {'query': query})
         return self.unpack(response)
 
 
@@ -314,22 +368,23 @@ class InvoicesApi(CrudModelApi):
     endpoint = 'invoices'
 
     TYPES = ['regular', 'proforma', 'correction', 'tax_document']
-    STATUSES = ['open', 'sent', 'overdue', 'paid', 'cancelled']
-    EVENTS = ['mark_as_sent', 'deliver', 'pay', 'pay_proforma', 'pay_partial_proforma', 'remove_payment', 'deliver_reminder', 'cancel', 'undo_cancel']
+    STATUSES = frozenset({'open', 'sent', 'overdue', 'paid', 'cancelled'})
+    EVENTS = frozenset({'mark_as_sent', 'deliver', 'pay', 'pay_proforma', 'pay_partial_proforma', 'remove_payment', 'deliver_reminder', 'cancel', 'undo_cancel'})
     EVENT_ARGS = {
-        'pay': {'paid_at', 'paid_amount'}
+        'pay': frozenset({'paid_at', 'paid_amount'})
     }
 
     def fire(self, invoice_id, event, **kwargs):
         if not isinstance(invoice_id, int):
             raise TypeError('invoice_id must be int')
         if event not in self.EVENTS:
-            raise ValueError('invalid event, expected one of {0}'.format(', '.join(self.EVENTS)))
+            raise ValueError('invalid event, expected one of {0}'.format(', '.join(sorted(self.EVENTS))))
 
-        allowed_args = self.EVENT_ARGS.get(event, set())
-        if not set(kwargs.keys()).issubset(allowed_args):
-            msg = "invalid event arguments, only {0} can be used with {1}".format(', '.join(allowed_args), event)
-            raise ValueError(msg)
+        allowed_args = self.EVENT_ARGS.get(event, frozenset())
+        for arg in kwargs:
+            if arg not in allowed_args:
+                msg = "invalid event arguments, only {0} can be used with {1}".format(', '.join(sorted(allowed_args)), event)
+                raise ValueError(msg)
 
         params = {'event': event}
         params.update(kwargs)
@@ -339,37 +394,14 @@ class InvoicesApi(CrudModelApi):
                 raise TypeError("'paid_at' argument must be date")
             params['paid_at'] = params['paid_at'].isoformat()
 
-        self.session._post('invoices/{0}/fire'.format(invoice_id), {}, params=params)
+        self.session._post(f'invoices/{invoice_id}/fire', {}, params=params)
 
     def find(self, proforma=None, subject_id=None, since=None, until=None, updated_since=None, updated_until=None, number=None, status=None, custom_id=None):
-        params = {}
-        if subject_id:
-            if not isinstance(subject_id, int):
-                raise TypeError("'subject_id' parameter must be int")
-            params['subject_id'] = subject_id
-        if since:
-            if not isinstance(since, (datetime, date)):
-                raise TypeError("'since' parameter must be date or datetime")
-            params['since'] = since.isoformat()
-        if until:
-            if not isinstance(until, (datetime, date)):
-                raise TypeError("'until' parameter must be date or datetime")
-            params['until'] = until.isoformat()
-        if updated_since:
-            if not isinstance(updated_since, (datetime, date)):
-                raise TypeError("'updated_since' parameter must be date or datetime")
-            params['updated_since'] = updated_since.isoformat()
-        if updated_until:
-            if not isinstance(updated_until, (datetime, date)):
-                raise TypeError("'updated_until' parameter must be date or datetime")
-            params['updated_until'] = updated_until.isoformat()
-        if number:
-            params['number'] = number
-        if custom_id:
-            params['custom_id'] = custom_id
+        params = _build_params(subject_id=subject_id, since=since, until=until, updated_since=updated_since,
+                               updated_until=updated_until, number=number, custom_id=custom_id)
         if status:
             if status not in self.STATUSES:
-                raise ValueError('invalid invoice status, expected one of {0}'.format(', '.join(self.STATUSES)))
+                raise ValueError('invalid invoice status, expected one of {0}'.format(', '.join(sorted(self.STATUSES))))
             params['status'] = status
 
         if proforma is not None:
@@ -388,22 +420,23 @@ class ExpensesApi(CrudModelApi):
     model_type = Expense
     endpoint = 'expenses'
 
-    STATUSES = ['open', 'overdue', 'paid']
-    EVENTS = ['remove_payment', 'deliver', 'pay', 'lock', 'unlock']
+    STATUSES = frozenset({'open', 'overdue', 'paid'})
+    EVENTS = frozenset({'remove_payment', 'deliver', 'pay', 'lock', 'unlock'})
     EVENT_ARGS = {
-        'pay': {'paid_on', 'paid_amount', 'variable_symbol', 'bank_account_id'}
+        'pay': frozenset({'paid_on', 'paid_amount', 'variable_symbol', 'bank_account_id'})
     }
 
     def fire(self, expense_id, event, **kwargs):
         if not isinstance(expense_id, int):
             raise TypeError('expense_id must be int')
         if event not in self.EVENTS:
-            raise ValueError('invalid event, expected one of {0}'.format(', '.join(self.EVENTS)))
+            raise ValueError('invalid event, expected one of {0}'.format(', '.join(sorted(self.EVENTS))))
 
-        allowed_args = self.EVENT_ARGS.get(event, set())
-        if not set(kwargs.keys()).issubset(allowed_args):
-            msg = "invalid event arguments, only {0} can be used with {1}".format(', '.join(allowed_args), event)
-            raise ValueError(msg)
+        allowed_args = self.EVENT_ARGS.get(event, frozenset())
+        for arg in kwargs:
+            if arg not in allowed_args:
+                msg = "invalid event arguments, only {0} can be used with {1}".format(', '.join(sorted(allowed_args)), event)
+                raise ValueError(msg)
 
         params = {'event': event}
         params.update(kwargs)
@@ -413,32 +446,15 @@ class ExpensesApi(CrudModelApi):
                 raise TypeError("'paid_on' argument must be date")
             params['paid_on'] = params['paid_on'].isoformat()
 
-        self.session._post('expenses/{0}/fire'.format(expense_id), {}, params=params)
+        self.session._post(f'expenses/{expense_id}/fire', {}, params=params)
 
     def find(self, subject_id=None, since=None, updated_since=None, number=None, status=None, custom_id=None, variable_symbol=None):
-        params = {}
-        if subject_id:
-            if not isinstance(subject_id, int):
-                raise TypeError("'subject_id' parameter must be int")
-            params['subject_id'] = subject_id
-        if since:
-            if not isinstance(since, (datetime, date)):
-                raise TypeError("'since' parameter must be date or datetime")
-            params['since'] = since.isoformat()
-        if updated_since:
-            if not isinstance(updated_since, (datetime, date)):
-                raise TypeError("'updated_since' parameter must be date or datetime")
-            params['updated_since'] = updated_since.isoformat()
-        if number:
-            params['number'] = number
-        if custom_id:
-            params['custom_id'] = custom_id
+        params = _build_params(subject_id=subject_id, since=since, updated_since=updated_since, number=number,
+                               custom_id=custom_id, variable_symbol=variable_symbol)
         if status:
             if status not in self.STATUSES:
-                raise ValueError('invalid invoice status, expected one of {0}'.format(', '.join(self.STATUSES)))
+                raise ValueError('invalid invoice status, expected one of {0}'.format(', '.join(sorted(self.STATUSES))))
             params['status'] = status
-        if variable_symbol:
-            params['variable_symbol'] = variable_symbol
 
         return ModelList(self, self.endpoint, params)
 
@@ -451,7 +467,7 @@ class ExpensePaymentsApi(ModelApi):
         expense_id = kwargs.get('expense_id')
         if not isinstance(expense_id, int):
             raise TypeError("expense_id must be int")
-        result = self.session._post('expenses/{0}/{1}'.format(expense_id, self.endpoint), model.get_fields())
+        result = self.session._post(f'expenses/{expense_id}/{self.endpoint}', model.get_fields())
         model.update(result['json'])
 
     def delete(self, model,  **kwargs):
@@ -459,7 +475,7 @@ class ExpensePaymentsApi(ModelApi):
         if not isinstance(expense_id, int):
             raise TypeError("expense_id must be int")
         model_id = self.extract_id(model)
-        self.session._delete('expenses/{0}/{1}/{2}'.format(expense_id, self.endpoint, model_id))
+        self.session._delete(f'expenses/{expense_id}/{self.endpoint}/{model_id}')
 
 
 class GeneratorsApi(CrudModelApi):
@@ -467,22 +483,14 @@ class GeneratorsApi(CrudModelApi):
     endpoint = 'generators'
 
     def find(self, recurring=None, subject_id=None, since=None):
-        params = {}
-        if subject_id:
-            if not isinstance(subject_id, int):
-                raise TypeError("'subject_id' parameter must be int")
-            params['subject_id'] = subject_id
-        if since:
-            if not isinstance(since, (datetime, date)):
-                raise TypeError("'since' parameter must be date or datetime")
-            params['since'] = since.isoformat()
+        params = _build_params(subject_id=subject_id, since=since)
 
         if recurring is None:
             endpoint = self.endpoint
         elif recurring:
-            endpoint = '{0}/recurring'.format(self.endpoint)
+            endpoint = f'{self.endpoint}/recurring'
         else:
-            endpoint = '{0}/template'.format(self.endpoint)
+            endpoint = f'{self.endpoint}/template'
 
         return super(GeneratorsApi, self).find(params, endpoint)
 
@@ -495,7 +503,7 @@ class MessagesApi(ModelApi):
         invoice_id = kwargs.get('invoice_id')
         if not isinstance(invoice_id, int):
             raise TypeError("invoice_id must be int")
-        self.session._post('invoices/{0}/{1}'.format(invoice_id, self.endpoint), model.get_fields())
+        self.session._post(f'invoices/{invoice_id}/{self.endpoint}', model.get_fields())
 
 
 class PaymentsApi(ModelApi):
@@ -506,7 +514,7 @@ class PaymentsApi(ModelApi):
         invoice_id = kwargs.get('invoice_id')
         if not isinstance(invoice_id, int):
             raise TypeError("invoice_id must be int")
-        result = self.session._post('invoices/{0}/{1}'.format(invoice_id, self.endpoint), model.get_fields())
+        result = self.session._post(f'invoices/{invoice_id}/{self.endpoint}', model.get_fields())
         model.update(result['json'])
 
     def delete(self, model,  **kwargs):
@@ -514,7 +522,7 @@ class PaymentsApi(ModelApi):
         if not isinstance(invoice_id, int):
             raise TypeError("invoice_id must be int")
         model_id = self.extract_id(model)
-        self.session._delete('invoices/{0}/{1}/{2}'.format(invoice_id, self.endpoint, model_id))
+        self.session._delete(f'invoices/{invoice_id}/{self.endpoint}/{model_id}')
 
     def create_tax_document(self, model, **kwargs):
         invoice_id = kwargs.get('invoice_id')
@@ -522,7 +530,7 @@ class PaymentsApi(ModelApi):
             raise TypeError("invoice_id must be int")
         model_id = self.extract_id(model)
         result = self.session._post(
-            'invoices/{0}/{1}/{2}/create_tax_document'.format(invoice_id, self.endpoint, model_id),
+            f'invoices/{invoice_id}/{self.endpoint}/{model_id}/create_tax_document',
             model.get_fields()
         )
         model.update(result['json'])
@@ -1,6 +1,9 @@
 from __future__ import unicode_literals
 
+from datetime import date, datetime
 from decimal import Decimal
+from functools import lru_cache
+
 from dateutil.parser import parse
 
 from fakturoid import six
@@ -9,26 +12,105 @@ __all__ = ['Account', 'BankAccount', 'Subject', 'InvoiceLine', 'Invoice', 'Gener
            'InvoicePayment', 'Expense', 'ExpensePayment']
 
 
+@lru_cache(maxsize=1024)
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return parse(value)
+
+
+@lru_cache(maxsize=1024)
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return parse(value).date()
+
+
+@lru_cache(maxsize=4096)
+def _to_decimal(value):
+    return Decimal(value)
+
+
+_RAW_PREFIX = '_raw_'
+
+
 class Model(six.UnicodeMixin):
     """Base class for all Fakturoid model objects"""
     id = None
 
+    # field name -> (converter, raw field name or None) or None, filled lazily per class
+    _field_converters = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super(Model, cls).__init_subclass__(**kwargs)
+        cls._field_converters = {}
+        # field lists are used for membership tests only
+        meta = cls.__dict__.get('Meta')
+        if meta is not None:
+            for attr in ('decimal', 'readonly'):
+                if hasattr(meta, attr):
+                    setattr(meta, attr, frozenset(getattr(meta, attr)))
+
     def __init__(self, **fields):
         self.update(fields)
 
+    @classmethod
+    def _from_dict(cls, fields):
+        """Create instance from API response fields without keyword arguments unpacking."""
+        obj = cls.__new__(cls)
+        obj.update(fields)
+        return obj
+
     def __repr__(self):
         return "<{0}:{1}>".format(self.__class__.__name__, self.id)
 
+    def __getattr__(self, name):
+        # called only for missing attributes - convert raw value stored by update()
+        d = self.__dict__
+        try:
+            raw = d.pop(_RAW_PREFIX + name)
+        except KeyError:
+            raise AttributeError("'{0}' object has no attribute '{1}'".format(self.__class__.__name__, name)) from None
+        value = d[name] = self._field_converters[name][0](raw)
+        return value
+
+    @classmethod
+    def _field_converter(cls, field):
+        if field.endswith('_at'):
+            converter = _parse_datetime
+        elif field.endswith(('_on', '_due', '_date')):
+            converter = _parse_date
+        elif field in cls.Meta.decimal:
+            converter = _to_decimal
+        else:
+            return None
+        # class level defaults would shadow __getattr__, convert such fields eagerly
+        if hasattr(cls, field):
+            return converter, None
+        return converter, _RAW_PREFIX + field
+
     def update(self, fields):
+        converters = self._field_converters
+        d = self.__dict__
         for field, value in fields.items():
-            if value and isinstance(value, six.string_types):
-                if field.endswith('_at'):
-                    fields[field] = parse(value)
-                elif field.endswith('_on') or field.endswith('_due') or field.endswith('_date'):
-                    fields[field] = parse(value).date()
-                elif field in self.Meta.decimal:
-                    fields[field] = Decimal(value)
-        self.__dict__.update(fields)
+            try:
+                converter = converters[field]
+            except KeyError:
+                converter = converters[field] = self._field_converter(field)
+            if converter is not None:
+                convert, raw_field = converter
+                if value and isinstance(value, six.string_types):
+                    if raw_field is not None:
+                        # keep raw string, converted on first access
+                        d.pop(field, None)
+                        d[raw_field] = value
+                        continue
+                    value = convert(value)
+                elif raw_field is not None:
+                    d.pop(raw_field, None)
+            d[field] = value
 
     def is_field_writable(self, field, value):
         # if hasattr(self.Meta, 'writable'):
@@ -53,7 +135,13 @@ class Model(six.UnicodeMixin):
 
     def get_fields(self):
         data = {}
-        for field, value in self.__dict__.items():
+        d = self.__dict__
+        for field, value in d.items():
+            if field.startswith(_RAW_PREFIX):
+                # not converted yet, raw value is already in API format
+                field = field[len(_RAW_PREFIX):]
+                if field in d:
+                    continue
             if self.is_field_writable(field, value):
                 data[field] = self.serialize_field_value(field, value)
         return data
@@ -125,25 +213,44 @@ class InvoiceLine(Model):
 
 
 class AbstractInvoice(Model):
-    lines = []
-    _loaded_lines = []  # keep loaded data to be able delete removed lines
+
+    def __init__(self, **fields):
+        self._init_lines()
+        super(AbstractInvoice, self).__init__(**fields)
+
+    @classmethod
+    def _from_dict(cls, fields):
+        obj = cls.__new__(cls)
+        obj._init_lines()
+        obj.update(fields)
+        return obj
+
+    def _init_lines(self):
+        self.lines = []
+        self._loaded_lines = []  # keep loaded data to be able delete removed lines
 
     def update(self, fields):
+        # raw 'lines' written by Model.update are replaced by InvoiceLine objects below
+        super(AbstractInvoice, self).update(fields)
         if 'lines' in fields:
             self.lines = []
             self._loaded_lines = []
-            for line in fields.pop('lines'):
+            for line in fields['lines']:
                 if not isinstance(line, InvoiceLine):
                     if 'id' in line:
                         self._loaded_lines.append(line)
                     line = InvoiceLine(**line)
                 self.lines.append(line)
-        super(AbstractInvoice, self).update(fields)
 
     def serialize_field_value(self, field, value):
         result = super(AbstractInvoice, self).serialize_field_value(field, value)
         if field == 'lines':
-            ids = map(lambda l: l.get('id'), result)
+            ids = set()
+            for line, data in zip(value, result):
+                line_id = getattr(line, 'id', None)
+                if line_id is not None:
+                    data['id'] = line_id  # readonly for line itself, but API needs it to update kept line
+                    ids.add(line_id)
             for remote in self._loaded_lines:
                 if remote['id'] not in ids:
                     remote['_destroy'] = True
@@ -151,8 +258,10 @@ class AbstractInvoice(Model):
         return result
 
     def is_field_writable(self, field, value):
-        if field.startswith('your_') or field.startswith('client_'):
+        if field == '_loaded_lines' or field.startswith('your_') or field.startswith('client_'):
             return False
+        if field == 'lines' and not value and not self._loaded_lines:
+            return False  # nothing to add nor delete
         return super(AbstractInvoice, self).is_field_writable(field, value)
 
 
@@ -1,60 +1,118 @@
+import asyncio
 import itertools
+from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
 
 from fakturoid import six
 
 
 class PagedResource(object):
-    """List adapter for paged resources. Do not use it unless required
-       as it loads all the pages."""
+    """List adapter for paged resources. Pages are loaded in order as far as
+       indexing requires, len() and negative indices load all the pages."""
+
+    max_workers = 8  # concurrent page requests of load_all_pages, once page count is known
 
     def __init__(self):
         self.objects = None
         self.pages = {}
         self.item_count = None
+        self.page_count = None
+        self._next_page = 0  # first page not appended to objects yet
+        self._complete = False
+        self._futures = {}
+        self._executor = None
 
     def load_page(self, n):
         raise NotImplementedError("You must implement load_page method.")
 
     def load_all_pages(self):
-        self.objects = []
-        self.item_count = 0
-        for n in itertools.count():
-            try:
-                page = self.get_page(n)
-                self.objects.extend(page)
-                self.item_count += len(page)
-            except IndexError:
-                # we've reached the end of list
-                break
+        try:
+            while self._load_next_page(prefetch=self.max_workers):
+                pass
+        finally:
+            # never leave background requests behind, also when loading fails
+            self._stop_prefetch()
+
+    def _load_next_page(self, prefetch=0):
+        """Append next page to objects, returns False at the end of list."""
+        if self.objects is None:
+            self.objects = []
+            self.item_count = 0
+        n = self._next_page
+        if self.page_count is not None and n >= self.page_count:
+            self._finish()
+        if self._complete:
+            return False
+        try:
+            page = self.get_page(n, prefetch)
+        except IndexError:
+            # we've reached the end of list
+            self._finish()
+            return False
+        self.objects.extend(page)
+        self.item_count += len(page)
+        self._next_page = n + 1
+        return True
+
+    def _finish(self):
+        self._complete = True
+
+    def _stop_prefetch(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     def ensure_all_pages(self):
-        if not self.objects:
+        if not self._complete:
             self.load_all_pages()
-            
-    def get_page(self, n):
+
+    def ensure_index(self, index):
+        """Load pages until object at index is available (or list ends)."""
+        while (self.objects is None or len(self.objects) <= index) and self._load_next_page():
+            pass
+
+    def get_page(self, n, prefetch=0):
+        """Return page n. Once page count is known, up to prefetch following
+           pages are requested concurrently in background."""
+        if prefetch and self.page_count:
+            self._prefetch(range(n, min(n + 1 + prefetch, self.page_count)))
         if n in self.pages:
             return self.pages[n]
-        page = self.load_page(n)
+        future = self._futures.pop(n, None)
+        page = future.result() if future is not None else self.load_page(n)
         if page:
             self.pages[n] = page
             return page
         raise IndexError('index out of range')
 
+    def _prefetch(self, page_numbers):
+        for n in page_numbers:
+            if n not in self.pages and n not in self._futures:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                self._futures[n] = self._executor.submit(self.load_page, n)
+
     def __len__(self):
         self.ensure_all_pages()
         return self.item_count
 
-
     def __getitem__(self, key):
-        self.ensure_all_pages()
         if isinstance(key, int):
             if key < 0:
                 key = len(self) + key
                 if key < 0:
                     raise IndexError('index out of range')
+            else:
+                self.ensure_index(key)
             return self.objects[key]
         elif isinstance(key, slice):
+            start, stop, step = key.start, key.stop, key.step
+            if (start or 0) >= 0 and stop is not None and stop >= 0 and (step or 1) > 0:
+                # only pages up to stop are loaded
+                return islice(self, start, stop, step)
             # TODO support negative step
             return islice(self, *key.indices(len(self)))
         else:
@@ -68,18 +126,58 @@ class ModelList(PagedResource, six.UnicodeMixin):
         self.model_api = model_api
         self.endpoint = endpoint
         self.params = params or {}
+        # lists of AsyncFakturoid are only iterated with async for
+        self._async = asyncio.iscoroutinefunction(model_api.session._get)
 
     def load_page(self, n):
+        if self._async:
+            raise TypeError('list from AsyncFakturoid must be iterated with async for')
+        response = self.model_api.session._get(self.endpoint, params=self._page_params(n))
+        return self._unpack_page(n, response)
+
+    async def aload_page(self, n):
+        """load_page for lists created by AsyncFakturoid"""
+        response = await self.model_api.session._get(self.endpoint, params=self._page_params(n))
+        return self._unpack_page(n, response)
+
+    def _page_params(self, n):
         params = {'page': n + 1}
         params.update(self.params)
-        response = self.model_api.session._get(self.endpoint, params=params)
+        return params
+
+    def _unpack_page(self, n, response):
+        if n == 0:
+            self.page_count = response.get('page_count')
         objects = list(self.model_api.unpack(response))
         return objects
 
+    async def __aiter__(self):
+        """Iterate list created by AsyncFakturoid, remaining pages are fetched concurrently
+        when page count is known from the first page."""
+        if not self._async:
+            raise TypeError('async for requires list from AsyncFakturoid')
+        page = await self.aload_page(0)
+        for obj in page:
+            yield obj
+        if not page:
+            return
+        if self.page_count:
+            pages = await asyncio.gather(*(self.aload_page(n) for n in range(1, self.page_count)))
+            for page in pages:
+                for obj in page:
+                    yield obj
+        else:
+            for n in itertools.count(1):
+                page = await self.aload_page(n)
+                if not page:
+                    break
+                for obj in page:
+                    yield obj
+
     def __unicode__(self):
-        # TODO print if loaded
-        if self.objects:
+        # item count is only known once all pages are loaded, never load them here
+        if self._complete:
             return "<list of {0} models ({1} items)>".format(
-                self.model_api.model_type.__name__, len(self))
+                self.model_api.model_type.__name__, len(self.objects))
         else:
             return "<list of {0} models>".format(self.model_api.model_type.__name__)
@@ -34,6 +34,7 @@ setup(
     keywords=['fakturoid', 'accounting'],
     packages=['fakturoid'],
     install_requires=['requests', 'python-dateutil'],
+    extras_require={'orjson': ['orjson'], 'ujson': ['ujson'], 'aio': ['aiohttp']},
     tests_require=['mock'],
     test_suite="tests",
     classifiers=[
@@ -1,22 +1,33 @@
 import os
 import json
 
+from requests import HTTPError
+
 
 class FakeResponse(object):
     status_code = 200
     text = None
-    headers = []
+    content = None
+    headers = {}
 
-    def __init__(self, text):
+    def __init__(self, text, status_code=200, headers=None):
         self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = status_code
+        self.headers = headers or {}
 
     def json(self):
         return json.loads(self.text)
 
     def raise_for_status(self):
-        pass
+        if self.status_code >= 400:
+            raise HTTPError('{0} Error'.format(self.status_code), response=self)
 
 
-def response(name):
+def response(name, **kwargs):
     content = open(os.path.join(os.path.dirname(__file__), 'responses', name)).read()
-    return FakeResponse(content)
+    return FakeResponse(content, **kwargs)
+
+
+def token_response():
+    return FakeResponse(json.dumps({'access_token': 'T0KEN', 'expires_in': 7200}))
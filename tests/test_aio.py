@@ -0,0 +1,186 @@
+from __future__ import absolute_import
+
+import asyncio
+import json
+import os
+import time
+import unittest
+from email.utils import formatdate
+
+try:
+    from aiohttp import ClientResponseError, web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    raise unittest.SkipTest('aiohttp is not installed')
+
+from fakturoid.aio import AsyncFakturoid, _parse_rate_limit, _retry_delay
+
+
+def fixture(name):
+    with open(os.path.join(os.path.dirname(__file__), 'responses', name)) as f:
+        return json.load(f)
+
+
+class RateLimitHeadersTestCase(unittest.TestCase):
+
+    def test_fakturoid_headers(self):
+        self.assertEqual((399, 55), _parse_rate_limit({'X-RateLimit': 'default;r=399;t=55',
+                                                       'X-RateLimit-Policy': 'default;q=400;w=60'}))
+        self.assertEqual((0, 60), _parse_rate_limit({'X-RateLimit': 'default;r=0',
+                                                     'X-RateLimit-Policy': 'default;q=400;w=60'}))
+        self.assertEqual((None, None), _parse_rate_limit({}))
+
+    def test_reset_timestamp(self):
+        remaining, reset = _parse_rate_limit({'X-RateLimit-Remaining': '0',
+                                              'X-RateLimit-Reset': str(int(time.time()) + 30)})
+        self.assertEqual(0, remaining)
+        self.assertTrue(25 < reset <= 30)
+        self.assertEqual((2, 30), _parse_rate_limit({'X-RateLimit-Remaining': '2', 'X-RateLimit-Reset': '30'}))
+
+    def test_retry_delay(self):
+        self.assertEqual(5, _retry_delay({'Retry-After': '5'}, 0))
+        self.assertTrue(15 < _retry_delay({'Retry-After': formatdate(time.time() + 20, usegmt=True)}, 0) <= 20)
+        self.assertEqual(55, _retry_delay({'X-RateLimit': 'default;r=0;t=55'}, 0))
+        self.assertEqual(8, _retry_delay({}, 3))
+
+
+class AsyncFakturoidTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.hits = {}
+        self.token_status = 200
+        self.rate_limited = 0  # number of following requests answered with 429
+        self.rate_limit_headers = {}
+
+        app = web.Application()
+        app.router.add_post('/api/v3/oauth/token', self.token)
+        app.router.add_get('/api/v3/accounts/myslug/invoices.json', self.invoices)
+        app.router.add_get('/api/v3/accounts/myslug/invoices/9.json', self.invoice)
+        app.router.add_get('/api/v3/accounts/myslug/subjects/28.json', self.invalid)
+        app.router.add_get('/api/v3/accounts/myslug/account.json', self.server_error)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        base_url = str(self.server.make_url('/api/v3/'))
+
+        class TestAsyncFakturoid(AsyncFakturoid):
+            pass
+        TestAsyncFakturoid.base_url = base_url  # point both token and API requests to test server
+        self.fa = TestAsyncFakturoid('myslug', 'test@example.com', 'client_id', 'client_secret', 'Test App')
+
+    async def asyncTearDown(self):
+        await self.fa.close()
+        await self.server.close()
+
+    def hit(self, name):
+        self.hits[name] = self.hits.get(name, 0) + 1
+
+    async def token(self, request):
+        self.hit('token')
+        if self.token_status != 200:
+            return web.Response(status=self.token_status)
+        return web.json_response({'access_token': 'T0KEN', 'expires_in': 7200})
+
+    async def invoices(self, request):
+        self.hit('invoices')
+        page = int(request.query['page'])
+        data = [{'id': page * 10 + i, 'number': '2024-{0}{1}'.format(page, i)} for i in range(2)]
+        return web.json_response(data, headers={
+            'Link': '<http://x/invoices.json?page={0}>; rel="next", <http://x/invoices.json?page=3>; rel="last"'.format(page + 1)
+        })
+
+    async def invoice(self, request):
+        self.hit('invoice')
+        assert request.headers['Authorization'] == 'Bearer T0KEN'
+        assert request.headers['User-Agent'] == 'Test App'
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.json_response(fixture('invoice_9.json'), headers=self.rate_limit_headers)
+
+    async def invalid(self, request):
+        return web.json_response({'errors': {'name': ['je povinná položka']}}, status=422)
+
+    async def server_error(self, request):
+        return web.Response(status=500)
+
+    async def test_load(self):
+        async with self.fa:
+            invoice = await self.fa.invoice(9)
+
+        self.assertEqual('2012-0004', invoice.number)
+        self.assertEqual({'token': 1, 'invoice': 1}, self.hits)
+
+    async def test_paged_list(self):
+        async with self.fa:
+            numbers = [invoice.number async for invoice in self.fa.invoices()]
+
+        self.assertEqual(['2024-10', '2024-11', '2024-20', '2024-21', '2024-30', '2024-31'], numbers)
+        self.assertEqual(3, self.hits['invoices'])
+
+    async def test_retry_rate_limited(self):
+        self.rate_limited = 2
+        async with self.fa:
+            invoice = await self.fa.invoice(9)
+
+        self.assertEqual('2012-0004', invoice.number)
+        self.assertEqual(3, self.hits['invoice'])
+
+    async def test_retry_exhausted(self):
+        self.rate_limited = 10
+        self.fa.max_retries = 2
+        async with self.fa:
+            with self.assertRaises(ClientResponseError) as cm:
+                await self.fa.invoice(9)
+
+        self.assertEqual(429, cm.exception.status)
+        self.assertEqual(3, self.hits['invoice'])
+
+    async def test_throttle_exhausted_limit(self):
+        self.rate_limit_headers = {'X-RateLimit': 'default;r=0;t=30', 'X-RateLimit-Policy': 'default;q=400;w=60'}
+        async with self.fa:
+            await self.fa.invoice(9)
+            loop = asyncio.get_running_loop()
+            self.assertTrue(loop.time() + 25 < self.fa._throttled_until <= loop.time() + 30)
+
+    async def test_throttle_capped(self):
+        self.rate_limit_headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 3600)}
+        async with self.fa:
+            await self.fa.invoice(9)
+            loop = asyncio.get_running_loop()
+            self.assertTrue(self.fa._throttled_until <= loop.time() + self.fa.max_retry_delay)
+
+    async def test_errors(self):
+        async with self.fa:
+            with self.assertRaises(ValueError):
+                await self.fa.subject(28)
+            with self.assertRaises(ClientResponseError) as cm:
+                await self.fa.account()
+
+        self.assertEqual(500, cm.exception.status)
+
+    async def test_refresh_expired_token_once(self):
+        async with self.fa:
+            self.fa._access_token_expiration = self.fa._access_token_expiration.replace(year=2000)
+            await asyncio.gather(*(self.fa.invoice(9) for _ in range(5)))
+
+        self.assertEqual(2, self.hits['token'])
+        self.assertEqual(5, self.hits['invoice'])
+
+    async def test_not_opened(self):
+        with self.assertRaises(RuntimeError):
+            await self.fa.invoice(9)
+
+        self.assertEqual({}, self.hits)
+
+    async def test_open_failure_closes_session(self):
+        self.token_status = 401
+        with self.assertRaises(ClientResponseError):
+            async with self.fa:
+                pass
+
+        self.assertIsNone(self.fa._session)
+
+
+if __name__ == '__main__':
+    unittest.main()
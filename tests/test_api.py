@@ -1,104 +1,226 @@
 from __future__ import absolute_import
 
+import threading
+import time
 import unittest
-from datetime import date
+from datetime import date, datetime, timedelta
 from mock import patch
 
-from fakturoid import Fakturoid
+from requests import HTTPError
 
-from tests.mock import response, FakeResponse
+from fakturoid import Fakturoid, Subject
+from fakturoid.api import _build_params, _extract_page_link
+
+from tests.mock import response, token_response, FakeResponse
 
 
 class FakturoidTestCase(unittest.TestCase):
 
     def setUp(self):
-        self.fa = Fakturoid('myslug', '9ACA7', 'Test App')
+        with patch('requests.Session.request', return_value=token_response()):
+            self.fa = Fakturoid('myslug', 'test@example.com', 'client_id', 'client_secret', 'Test App')
+
+
+class SessionTestCase(FakturoidTestCase):
+
+    def test_session_headers(self):
+        self.assertEqual('Test App', self.fa._session.headers['User-Agent'])
+        self.assertEqual('Bearer T0KEN', self.fa._session.headers['Authorization'])
+
+    @patch('requests.Session.request', side_effect=[token_response(), response('account.json')])
+    def test_refresh_expired_token(self, mock):
+        self.fa._access_token_expiration = datetime(2000, 1, 1)
+        self.fa.account()
+
+        self.assertEqual(2, mock.call_count)
+        self.assertEqual('https://app.fakturoid.cz/api/v3/oauth/token', mock.call_args_list[0][1]['url'])
+        self.assertEqual('get', mock.call_args_list[1][0][0])
+        self.assertGreater(self.fa._access_token_expiration, datetime.now())
+
+    def test_refresh_expired_token_once(self):
+        self.fa._access_token_expiration = datetime(2000, 1, 1)
+        barrier = threading.Barrier(8)
+
+        def refresh():
+            time.sleep(0.05)  # let other threads reach the lock
+            self.fa._access_token_expiration = datetime.now() + timedelta(hours=1)
+
+        def load_account():
+            barrier.wait()
+            self.fa.account()
+
+        with patch.object(Fakturoid, 'refresh_access_token', side_effect=refresh) as refresh_mock, \
+                patch('requests.Session.request', return_value=response('account.json')):
+            threads = [threading.Thread(target=load_account) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        refresh_mock.assert_called_once_with()
+
+    @patch('requests.Session.request', return_value=FakeResponse('', status_code=204))
+    def test_delete(self, mock):
+        self.fa.delete(Subject(id=28))
+
+        mock.assert_called_once_with('delete', 'https://app.fakturoid.cz/api/v3/accounts/myslug/subjects/28.json')
+
+    @patch('requests.Session.request', return_value=FakeResponse('{"errors": {"name": ["je povinná položka"]}}', status_code=422))
+    def test_errors(self, mock):
+        with self.assertRaises(ValueError):
+            self.fa.save(Subject(name=''))
+
+    @patch('requests.Session.request', return_value=FakeResponse('', status_code=500))
+    def test_http_error(self, mock):
+        with self.assertRaises(HTTPError):
+            self.fa.account()
+
+
+class BuildParamsTestCase(unittest.TestCase):
+
+    def test_serialize(self):
+        self.assertEqual({
+            'subject_id': 28,
+            'since': '2024-01-01',
+            'updated_since': '2024-02-01T10:30:00',
+            'number': '2024-0001',
+        }, _build_params(subject_id=28, since=date(2024, 1, 1), until=None,
+                         updated_since=datetime(2024, 2, 1, 10, 30), number='2024-0001', custom_id=''))
+
+    def test_skip_unset(self):
+        self.assertEqual({}, _build_params(subject_id=None, since=None, updated_until=None, custom_id=None))
+
+    def test_invalid_date(self):
+        with self.assertRaises(TypeError) as cm:
+            _build_params(updated_until='2024-01-01')
+        self.assertEqual("'updated_until' parameter must be date or datetime", str(cm.exception))
+
+    def test_invalid_subject_id(self):
+        with self.assertRaises(TypeError) as cm:
+            _build_params(subject_id='28')
+        self.assertEqual("'subject_id' parameter must be int", str(cm.exception))
+
+
+class LinkHeaderTestCase(FakturoidTestCase):
+    LINK = ('<https://app.fakturoid.cz/api/v3/accounts/myslug/invoices.json?page=2>; rel="next", '
+            '<https://app.fakturoid.cz/api/v3/accounts/myslug/invoices.json?page=7>; rel="last"')
+
+    def test_extract_page_link(self):
+        self.assertEqual(7, _extract_page_link(self.LINK))
+        self.assertEqual(7, _extract_page_link('<https://x/invoices.json?page=7>; REL="last"'))
+        self.assertEqual(7, _extract_page_link('<https://x/invoices.json?page=7>;rel="last"'))
+        self.assertEqual(7, _extract_page_link('<https://x/invoices.json?page=7> ; rel="LAST"'))
+        self.assertIsNone(_extract_page_link(
+            '<https://x/invoices.json?page=1>; rel="prev", <https://x/invoices.json?page=3>; rel="next"'))
+
+    def test_page_count_first_page_only(self):
+        with patch('requests.Session.request', return_value=FakeResponse('[]', headers={'link': self.LINK})):
+            self.assertEqual(7, self.fa._get('invoices', params={'page': 1})['page_count'])
+            self.assertNotIn('page_count', self.fa._get('invoices', params={'page': 2}))
+            self.assertNotIn('page_count', self.fa._get('invoices'))
 
 
 class AccountTestCase(FakturoidTestCase):
 
-    @patch('requests.get', return_value=response('account.json'))
+    @patch('requests.Session.request', return_value=response('account.json'))
     def test_load(self, mock):
         account = self.fa.account()
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/account.json', mock.call_args[0][0])
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/account.json', mock.call_args[0][1])
         self.assertEqual("Alexandr Hejsek", account.name)
         self.assertEqual("testdph@test.cz", account.email)
 
 
 class SubjectTestCase(FakturoidTestCase):
 
-    @patch('requests.get', return_value=response('subject_28.json'))
+    @patch('requests.Session.request', return_value=response('subject_28.json'))
     def test_load(self, mock):
         subject = self.fa.subject(28)
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/subjects/28.json', mock.call_args[0][0])
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/subjects/28.json', mock.call_args[0][1])
         self.assertEqual(28, subject.id)
         self.assertEqual('47123737', subject.registration_no)
         self.assertEqual('2012-06-02T09:34:47+02:00', subject.updated_at.isoformat())
 
-    @patch('requests.get', return_value=response('subjects.json'))
+    @patch('requests.Session.request', side_effect=[response('subjects.json'), FakeResponse('[]')])
     def test_find(self, mock):
         subjects = self.fa.subjects()
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/subjects.json', mock.call_args[0][0])
         self.assertEqual(2, len(subjects))
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/subjects.json', mock.call_args[0][1])
+        self.assertEqual({'page': 1}, mock.call_args_list[0][1]['params'])
         self.assertEqual('Apple Czech s.r.o.', subjects[0].name)
 
 
 class InvoiceTestCase(FakturoidTestCase):
 
-    @patch('requests.get', return_value=response('invoice_9.json'))
+    @patch('requests.Session.request', return_value=response('invoice_9.json'))
     def test_load(self, mock):
         invoice = self.fa.invoice(9)
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9.json', mock.call_args[0][0])
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9.json', mock.call_args[0][1])
         self.assertEqual('2012-0004', invoice.number)
 
-    @patch('requests.post', return_value=FakeResponse(''))
+    @patch('requests.Session.request', return_value=FakeResponse(''))
     def test_fire(self, mock):
         self.fa.fire_invoice_event(9, 'pay')
 
-        mock.assert_called_once_with('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9/fire.json',
-                                     auth=('9ACA7', 'Test App'),
-                                     data='{}',
-                                     headers={'User-Agent': 'python-fakturoid (https://github.com/farin/python-fakturoid)', 'Content-Type': 'application/json'},
+        mock.assert_called_once_with('post', 'https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9/fire.json',
+                                     data=b'{}',
+                                     headers={'Content-Type': 'application/json'},
                                      params={'event': 'pay'})
 
-    @patch('requests.post', return_value=FakeResponse(''))
+    @patch('requests.Session.request', return_value=FakeResponse(''))
     def test_fire_with_args(self, mock):
         self.fa.fire_invoice_event(9, 'pay', paid_at=date(2018, 11, 19))
 
-        mock.assert_called_once_with('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9/fire.json',
-                                     auth=('9ACA7', 'Test App'),
-                                     data='{}',
-                                     headers={'User-Agent': 'python-fakturoid (https://github.com/farin/python-fakturoid)', 'Content-Type': 'application/json'},
+        mock.assert_called_once_with('post', 'https://app.fakturoid.cz/api/v3/accounts/myslug/invoices/9/fire.json',
+                                     data=b'{}',
+                                     headers={'Content-Type': 'application/json'},
                                      params={'event': 'pay', 'paid_at': '2018-11-19'})
 
-    @patch('requests.get', return_value=response('invoices.json'))
+    @patch('requests.Session.request')
+    def test_fire_invalid(self, mock):
+        with self.assertRaises(ValueError):
+            self.fa.fire_invoice_event(9, 'nonsense')
+        with self.assertRaises(ValueError):
+            self.fa.fire_invoice_event(9, 'pay', paid_on=date(2018, 11, 19))
+        with self.assertRaises(TypeError):
+            self.fa.fire_invoice_event(9, 'pay', paid_at='2018-11-19')
+        mock.assert_not_called()
+
+    @patch('requests.Session.request', side_effect=[response('invoices.json'), FakeResponse('[]')])
     def test_find(self, mock):
-        self.fa.invoices()[:10]
+        invoices = list(self.fa.invoices(status='paid')[:10])
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices.json', mock.call_args[0][0])
-        # TODO paging test
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/invoices.json', mock.call_args[0][1])
+        self.assertEqual({'page': 1, 'status': 'paid'}, mock.call_args_list[0][1]['params'])
+        self.assertEqual(['2012-0004', '2012-0005'], [i.number for i in invoices])
 
 
 class GeneratorTestCase(FakturoidTestCase):
 
-    @patch('requests.get', return_value=response('generator_4.json'))
+    @patch('requests.Session.request', return_value=response('generator_4.json'))
     def test_load(self, mock):
         g = self.fa.generator(4)
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/generators/4.json', mock.call_args[0][0])
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/generators/4.json', mock.call_args[0][1])
         self.assertEqual('Podpora', g.name)
 
-    @patch('requests.get', return_value=response('generators.json'))
+    @patch('requests.Session.request', return_value=response('generators.json'))
     def test_find(self, mock):
         generators = self.fa.generators()
 
-        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/generators.json', mock.call_args[0][0])
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/generators.json', mock.call_args[0][1])
         self.assertEqual(2, len(generators))
 
+    @patch('requests.Session.request', return_value=response('generators.json'))
+    def test_find_recurring(self, mock):
+        self.fa.generators(recurring=True, subject_id=28)
+
+        self.assertEqual('https://app.fakturoid.cz/api/v3/accounts/myslug/generators/recurring.json', mock.call_args[0][1])
+        self.assertEqual({'subject_id': 28}, mock.call_args[1]['params'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+
+from fakturoid.models import Invoice, InvoiceLine, Subject
+
+
+class ModelUpdateTestCase(unittest.TestCase):
+
+    def test_convert_fields(self):
+        invoice = Invoice(number='2012-0004', issued_on='2012-06-02', sent_at='2012-06-02T09:34:47+02:00',
+                          total='1210.00', note=None)
+
+        self.assertEqual('2012-0004', invoice.number)
+        self.assertEqual(date(2012, 6, 2), invoice.issued_on)
+        self.assertIsInstance(invoice.sent_at, datetime)
+        self.assertEqual('2012-06-02T09:34:47+02:00', invoice.sent_at.isoformat())
+        self.assertEqual(Decimal('1210.00'), invoice.total)
+        self.assertIsNone(invoice.note)
+
+    def test_lazy_conversion(self):
+        subject = Subject(name='Apple Czech s.r.o.', updated_at='2012-06-02T09:34:47+02:00')
+
+        self.assertNotIn('updated_at', subject.__dict__)
+        updated_at = subject.updated_at
+        self.assertIsInstance(updated_at, datetime)
+        self.assertIs(updated_at, subject.__dict__['updated_at'])
+        with self.assertRaises(AttributeError):
+            subject.missing
+
+    def test_update_does_not_modify_fields(self):
+        fields = {'number': '2012-0004', 'total': '1210.00', 'lines': [{'id': 1, 'name': 'Hard work'}]}
+        Invoice().update(fields)
+
+        self.assertEqual({'number': '2012-0004', 'total': '1210.00', 'lines': [{'id': 1, 'name': 'Hard work'}]}, fields)
+
+    def test_get_fields(self):
+        line = InvoiceLine(name='Hard work', unit_price='40')
+        line.vat_rate = 21
+
+        self.assertEqual({'name': 'Hard work', 'quantity': '1', 'unit_price': '40', 'vat_rate': 21}, line.get_fields())
+
+        invoice = Invoice(issued_on='2012-06-02', due_on='2012-06-16')
+        self.assertEqual({'issued_on': '2012-06-02'}, invoice.get_fields())
+        self.assertEqual({'note': 'x'}, Invoice(id=5, note='x').get_fields())
+
+    def test_lines(self):
+        invoice = Invoice._from_dict({'number': '2012-0004', 'lines': [{'id': 1, 'name': 'Hard work'}]})
+
+        self.assertEqual(['Hard work'], [line.name for line in invoice.lines])
+        self.assertEqual([{'id': 1, 'name': 'Hard work'}], invoice._loaded_lines)
+        self.assertNotIn('_loaded_lines', invoice.get_fields())
+        invoice.lines = []
+        self.assertEqual([{'id': 1, 'name': 'Hard work', '_destroy': True}], invoice.get_fields()['lines'])
+        self.assertEqual([], Invoice().lines)
+        self.assertEqual([], Invoice._from_dict({'number': '2012-0005'}).lines)
+        Invoice().lines.append(InvoiceLine(name='Hard work'))
+        self.assertEqual([], Invoice().lines)
+
+    def test_delete_line(self):
+        invoice = Invoice._from_dict({'lines': [{'id': 1, 'name': 'Hard work'}, {'id': 2, 'name': 'PC'}]})
+        del invoice.lines[-1]
+
+        self.assertEqual([
+            {'id': 1, 'name': 'Hard work', 'quantity': '1'},
+            {'id': 2, 'name': 'PC', '_destroy': True},
+        ], invoice.get_fields()['lines'])
+
+    def test_get_fields_prefers_assigned_value(self):
+        invoice = Invoice(issued_on='2012-06-02')
+        invoice.issued_on = date(2013, 1, 1)
+
+        self.assertEqual('2013-01-01', invoice.get_fields()['issued_on'])
+
+
+if __name__ == '__main__':
+    unittest.main()
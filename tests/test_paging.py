@@ -1,9 +1,10 @@
 from __future__ import absolute_import
 
+import asyncio
 import unittest
 from mock import patch
 
-from fakturoid.paging import PagedResource
+from fakturoid.paging import ModelList, PagedResource
 
 
 class PageResourceTestCase(unittest.TestCase):
@@ -39,7 +40,147 @@ class PageResourceTestCase(unittest.TestCase):
 
     @patch.object(PagedResource, 'load_page', return_value=['x', 'y', 'z'])
     def test_loadpage(self, load_page):
-        unloaded = PagedResource(page_size=3)
+        unloaded = PagedResource()
         unloaded.page_size = 5
         self.assertEqual('z', unloaded[2])
         load_page.assert_called_once_with(0)
+
+
+class CountedPagedResource(PagedResource):
+    """Fake resource announcing its page count with the first page."""
+
+    def __init__(self, pages, announce_count=True):
+        super(CountedPagedResource, self).__init__()
+        self.data = pages
+        self.announce_count = announce_count
+        self.loaded = []
+
+    def load_page(self, n):
+        self.loaded.append(n)
+        if n == 0 and self.announce_count:
+            self.page_count = len(self.data)
+        if n < len(self.data):
+            return self.data[n]
+        return []
+
+
+class LoadAllPagesTestCase(unittest.TestCase):
+
+    def test_known_page_count(self):
+        pg = CountedPagedResource(['abc', 'def', 'gh', 'ij'])
+        self.assertEqual('abcdefghij', ''.join(pg[:]))
+        self.assertEqual(10, len(pg))
+        self.assertEqual([0, 1, 2, 3], sorted(pg.loaded))
+
+    def test_unknown_page_count(self):
+        pg = CountedPagedResource(['abc', 'def', 'gh'], announce_count=False)
+        self.assertEqual('abcdefgh', ''.join(pg[:]))
+        self.assertEqual([0, 1, 2, 3], pg.loaded)
+
+    def test_getitem_loads_required_pages(self):
+        pg = CountedPagedResource(['abc', 'def', 'gh', 'ij'], announce_count=False)
+        self.assertEqual('e', pg[4])
+        self.assertEqual('abcd', ''.join(pg[:4]))
+        self.assertEqual([0, 1], pg.loaded)
+        self.assertEqual('j', pg[-1])
+        self.assertEqual([0, 1, 2, 3, 4], pg.loaded)
+
+    def test_getitem_does_not_prefetch(self):
+        pg = CountedPagedResource(['abc', 'def', 'gh', 'ij'])
+        self.assertEqual('a', pg[0])
+        self.assertEqual('d', pg[3])
+        self.assertEqual([0, 1], pg.loaded)
+        self.assertIsNone(pg._executor)
+        self.assertEqual(10, len(pg))
+        self.assertEqual([0, 1, 2, 3], sorted(pg.loaded))
+        self.assertIsNone(pg._executor)
+
+    def test_load_all_pages_failure_stops_prefetch(self):
+        pg = CountedPagedResource(['abc', 'def', 'gh', 'ij'])
+        pg.max_workers = 1
+        pg[0]
+        with patch.object(pg, 'load_page', side_effect=ValueError('API error')):
+            with self.assertRaises(ValueError):
+                len(pg)
+        self.assertEqual({}, pg._futures)
+        self.assertIsNone(pg._executor)
+
+
+class FakeSession(object):
+    """Fake Fakturoid serving pages of two numbers, page count is announced with the first page."""
+
+    def __init__(self, page_count, announce_count=True):
+        self.page_count = page_count
+        self.announce_count = announce_count
+        self.requested = []
+
+    def _get(self, endpoint, params=None):
+        self.requested.append(params['page'])
+        page = params['page']
+        response = {'json': [page * 10, page * 10 + 1] if page <= self.page_count else []}
+        if page == 1 and self.announce_count:
+            response['page_count'] = self.page_count
+        return response
+
+
+class AsyncFakeSession(FakeSession):
+    """Fake AsyncFakturoid with the same pages."""
+
+    async def _get(self, endpoint, params=None):
+        return super(AsyncFakeSession, self)._get(endpoint, params)
+
+
+class FakeModelApi(object):
+
+    class model_type(object):
+        pass
+
+    def __init__(self, session):
+        self.session = session
+
+    def unpack(self, response):
+        return response['json']
+
+
+class ModelListTestCase(unittest.TestCase):
+
+    def test_str_does_not_load(self):
+        model_api = FakeModelApi(FakeSession(2, announce_count=False))
+        ml = ModelList(model_api, 'invoices')
+
+        self.assertEqual('<list of model_type models>', str(ml))
+        self.assertEqual(10, ml[0])
+        self.assertEqual('<list of model_type models>', str(ml))
+        self.assertEqual([1], model_api.session.requested)
+        self.assertEqual(4, len(ml))
+        self.assertEqual('<list of model_type models (4 items)>', str(ml))
+        self.assertEqual([1, 2, 3], model_api.session.requested)
+
+
+class ModelListAsyncTestCase(unittest.TestCase):
+
+    def test_aiter(self):
+        model_api = FakeModelApi(AsyncFakeSession(3))
+        ml = ModelList(model_api, 'invoices', {'status': 'paid'})
+
+        async def collect():
+            return [obj async for obj in ml]
+
+        self.assertEqual([10, 11, 20, 21, 30, 31], asyncio.run(collect()))
+        self.assertEqual([1, 2, 3], sorted(model_api.session.requested))
+
+    def test_wrong_client(self):
+        async_list = ModelList(FakeModelApi(AsyncFakeSession(3)), 'invoices')
+        with self.assertRaises(TypeError):
+            len(async_list)
+        with self.assertRaises(TypeError):
+            async_list[0]
+
+        sync_list = ModelList(FakeModelApi(FakeSession(3)), 'invoices')
+
+        async def collect():
+            return [obj async for obj in sync_list]
+
+        with self.assertRaises(TypeError):
+            asyncio.run(collect())
+        self.assertEqual([], sync_list.model_api.session.requested)